@@ -2,33 +2,81 @@ import streamlit as st
 import preprocessor,helper
 import matplotlib.pyplot as plt
 import seaborn as sns
+import plotly.express as px
+import numpy as np
+import concurrent.futures
 
 
+@st.cache_data(show_spinner="Processing chat data...", max_entries=4)
+def _load_df(bytes_data):
+    return preprocessor.preprocess(bytes_data.decode("utf-8"))
 
-st.sidebar.title("GroupChat Analyzer")
+@st.cache_data
+def _user_list(df):
+    users = np.sort(df['user'].unique())
+    users = users[users != 'group_notification']
+    return ["Overall", *users]
 
-uploaded_file = st.sidebar.file_uploader("Choose a file")
-if uploaded_file is not None:
-    bytes_data = uploaded_file.getvalue()
-    data = bytes_data.decode("utf-8")
-    df = preprocessor.preprocess(data)
+@st.cache_resource(max_entries=4)
+def _user_slices(df):
+    # slice the frame per user once instead of re-filtering it in every helper
+    slices = {user: group for user, group in df.groupby('user', observed=True)}
+    slices['Overall'] = df
+    return slices
 
-    
-    user_list = df['user'].unique().tolist()
-    user_list.remove('group_notification')
-    user_list.sort()
-    user_list.insert(0,"Overall")
+@st.cache_data(max_entries=4)
+def _with_sentiment(df):
+    # score each distinct message once; "ok", media placeholders etc. repeat a lot
+    uniq = df['message'].unique()
+    scores = dict(zip(uniq, helper.analyze_sentiments_batch(uniq.tolist())))
+    return df.assign(sentiment=df['message'].map(scores))
 
-    selected_user = st.sidebar.selectbox("Show analysis wrt",user_list)
+@st.cache_data(max_entries=4)
+def _to_csv(df):
+    return df.to_csv(index=False).encode("utf-8")
 
-    # Sentiment Analysis function
-    def analyze_sentiment_wrapper(message):
-        return helper.analyze_sentiment(message)
 
+st.sidebar.title("GroupChat Analyzer")
 
-    if st.sidebar.button("Show Analysis"):
+uploaded_file = st.sidebar.file_uploader("Choose a file")
+if uploaded_file is not None:
+    # re-parse only when a different file is uploaded; other reruns reuse the frame
+    if st.session_state.get('file_id') != uploaded_file.file_id:
+        try:
+            st.session_state['df'] = _load_df(uploaded_file.getvalue())
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        st.session_state['file_id'] = uploaded_file.file_id
+    df = st.session_state['df']
 
-        num_messages, words, num_media_messages, num_links = helper.fetch_stats(selected_user,df)
+    
+    user_list = _user_list(df)
+
+    # picking a user doesn't rerun the script until the form is submitted
+    with st.sidebar.form("analysis_opts"):
+        selected_user = st.selectbox("Show analysis wrt",user_list)
+        submitted = st.form_submit_button("Show Analysis")
+
+    if submitted:
+
+        sub = _user_slices(df)[selected_user]
+
+        # these panels are independent pandas passes, so compute them side by side up front
+        # (their caches don't show spinners, which can't be drawn from worker threads)
+        panels = {
+            'timeline': helper.monthly_timeline,
+            'daily_timeline': helper.daily_timeline,
+            'busy_day': helper.week_activity_map,
+            'busy_month': helper.month_activity_map,
+            'user_heatmap': helper.activity_heatmap,
+            'emoji_df': helper.emoji_helper,
+        }
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
+            futures = {name: ex.submit(fn, sub) for name, fn in panels.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+        num_messages, words, num_media_messages, num_links = helper.fetch_stats(sub)
         st.title("Top Statistics")
         col1, col2, col3, col4 = st.columns(4)
 
@@ -47,19 +95,13 @@ if uploaded_file is not None:
 
         
         st.title("Monthly Timeline")
-        timeline = helper.monthly_timeline(selected_user,df)
-        fig,ax = plt.subplots()
-        ax.plot(timeline['time'], timeline['message'],color='green')
-        plt.xticks(rotation='vertical')
-        st.pyplot(fig)
+        timeline = results['timeline']
+        st.line_chart(timeline.set_index('time')['message'],color='#008000')
 
         
         st.title("Daily Timeline")
-        daily_timeline = helper.daily_timeline(selected_user, df)
-        fig, ax = plt.subplots()
-        ax.plot(daily_timeline['only_date'], daily_timeline['message'], color='black')
-        plt.xticks(rotation='vertical')
-        st.pyplot(fig)
+        daily_timeline = results['daily_timeline']
+        st.line_chart(daily_timeline.set_index('only_date')['message'], color='#000000')
 
         # activity map
         st.title('Activity Map')
@@ -67,95 +109,79 @@ if uploaded_file is not None:
 
         with col1:
             st.header("Most busy day")
-            busy_day = helper.week_activity_map(selected_user,df)
-            fig,ax = plt.subplots()
-            ax.bar(busy_day.index,busy_day.values,color='purple')
-            plt.xticks(rotation='vertical')
-            st.pyplot(fig)
+            busy_day = results['busy_day']
+            st.bar_chart(busy_day,color='#800080',sort=False)
 
         with col2:
             st.header("Most busy month")
-            busy_month = helper.month_activity_map(selected_user, df)
-            fig, ax = plt.subplots()
-            ax.bar(busy_month.index, busy_month.values,color='orange')
-            plt.xticks(rotation='vertical')
-            st.pyplot(fig)
+            busy_month = results['busy_month']
+            st.bar_chart(busy_month, color='#ffa500', sort=False)
 
         st.title("Weekly Activity Map")
-        user_heatmap = helper.activity_heatmap(selected_user,df)
+        user_heatmap = results['user_heatmap']
         fig,ax = plt.subplots()
         ax = sns.heatmap(user_heatmap)
         st.pyplot(fig)
+        plt.close(fig)
 
         # finding the busiest users in the group(Group level)
         if selected_user == 'Overall':
             st.title('Most Busy Users')
             x,new_df = helper.most_busy_users(df)
-            fig, ax = plt.subplots()
 
             col1, col2 = st.columns(2)
 
             with col1:
-                ax.bar(x.index, x.values,color='red')
-                plt.xticks(rotation='vertical')
-                st.pyplot(fig)
+                st.bar_chart(x,color='#ff0000',sort=False)
             with col2:
                 st.dataframe(new_df)
 
         # WordCloud
         st.title("Wordcloud")
-        df_wc = helper.create_wordcloud(selected_user,df)
+        df_wc = helper.create_wordcloud(sub)
         fig,ax = plt.subplots()
         ax.imshow(df_wc)
         st.pyplot(fig)
+        plt.close(fig)
 
         # most common words
-        most_common_df = helper.most_common_words(selected_user,df)
-
-        fig,ax = plt.subplots()
-
-        ax.barh(most_common_df[0],most_common_df[1])
-        plt.xticks(rotation='vertical')
+        most_common_df = helper.most_common_words(sub)
 
         st.title('Most commmon words')
-        st.pyplot(fig)
+        st.bar_chart(most_common_df.set_index(0)[1],horizontal=True,sort=False)
 
         # emoji analysis
-        emoji_df = helper.emoji_helper(selected_user,df)
+        emoji_df = results['emoji_df']
         st.title("Emoji Analysis")
 
         col1,col2 = st.columns(2)
 
         with col1:
-            st.dataframe(emoji_df)
+            st.table(emoji_df.head(10))
         with col2:
-            fig,ax = plt.subplots()
-            ax.pie(emoji_df[1].head(),labels=emoji_df[0].head(),autopct="%0.2f")
-            st.pyplot(fig)
+            st.plotly_chart(px.pie(emoji_df.head(),values=1,names=0))
 
 
         # Sentiment Analysis
         st.title("Sentiment Analysis")
-        df['sentiment'] = df['message'].apply(helper.analyze_sentiment_wrapper)
-        sentiment_counts = df['sentiment'].value_counts()
+        # the whole chat is scored once; switching users only re-filters it
+        df = _with_sentiment(df)
+        # slices keep the parsed frame's index, so the selected user's labels are looked up by label
+        scored = sub[sub['user'] != 'group_notification']
+        sentiment_counts = df['sentiment'].loc[scored.index].value_counts()
 
         # Display sentiment pie chart
-        fig, ax = plt.subplots()
-        ax.pie(sentiment_counts, labels=sentiment_counts.index, autopct="%1.1f%%", startangle=90, colors=['green', 'red', 'gray'])
-        st.pyplot(fig)
+        fig = px.pie(values=sentiment_counts.values, names=sentiment_counts.index, color=sentiment_counts.index,
+                     color_discrete_map={'Positive': 'green', 'Negative': 'red', 'Neutral': 'gray'})
+        st.plotly_chart(fig)
 
         # Display sentiment statistics
         st.title("Sentiment Statistics")
         st.table(sentiment_counts)
 
         # Export Data Button
-        if st.button("Export Data"):
-        # Save the DataFrame to a CSV file
-            df.to_csv('GroupChat Analyzer', index=False)
-
-        # Provide a download link to the user
-            st.markdown("### Download the analyzed data")
-            st.markdown("[Download CSV](sandbox:/Groupchat_analysis.csv)", unsafe_allow_html=True)
+        st.markdown("### Download the analyzed data")
+        st.download_button("Export Data", _to_csv(df), "Groupchat_analysis.csv", "text/csv", on_click="ignore")
 
 
 
@@ -1,48 +1,50 @@
-from urlextract import URLExtract
+import streamlit as st
 from wordcloud import WordCloud
-from textblob import TextBlob
+from textblob.sentiments import PatternAnalyzer
+import numpy as np
 import pandas as pd
 from collections import Counter
 import emoji
+import re
 
-extract = URLExtract()
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+analyzer = PatternAnalyzer()
 
-def fetch_stats(selected_user,df):
+@st.cache_resource
+def _stopwords():
+    with open('stop_hinglish.txt', 'r') as f:
+        return set(f.read().split())
 
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
+@st.cache_data
+def fetch_stats(df):
+
+    messages = df['message']
 
     # fetch the number of messages
     num_messages = df.shape[0]
 
     # fetch the total number of words
-    words = []
-    for message in df['message']:
-        words.extend(message.split())
+    num_words = int(messages.str.split().str.len().sum())
 
     # fetch number of media messages
-    num_media_messages = df[df['message'] == '<Media omitted>\n'].shape[0]
+    num_media_messages = int(messages.eq('<Media omitted>\n').sum())
 
     # fetch number of links shared
-    links = []
-    for message in df['message']:
-        links.extend(extract.find_urls(message))
+    num_links = int(messages.str.count(URL_PATTERN).sum())
 
-    return num_messages,len(words),num_media_messages,len(links)
+    return num_messages,num_words,num_media_messages,num_links
 
+@st.cache_data
 def most_busy_users(df):
     x = df['user'].value_counts().head()
     df = round((df['user'].value_counts() / df.shape[0]) * 100, 2).reset_index().rename(
         columns={'index': 'name', 'user': 'percent'})
     return x,df
 
-def create_wordcloud(selected_user,df):
+@st.cache_data(max_entries=32)
+def _wc_tokens(df):
 
-    f = open('stop_hinglish.txt', 'r')
-    stop_words = f.read()
-
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
+    stop_words = _stopwords()
 
     temp = df[df['user'] != 'group_notification']
     temp = temp[temp['message'] != '<Media omitted>\n']
@@ -54,18 +56,21 @@ def create_wordcloud(selected_user,df):
                 y.append(word)
         return " ".join(y)
 
+    return temp['message'].apply(remove_stop_words).str.cat(sep=" ")
+
+@st.cache_data(max_entries=32)
+def _render_wc(text):
+    # generate() stores the layout on the WordCloud object, so each render gets its own
     wc = WordCloud(width=500,height=500,min_font_size=10,background_color='white')
-    temp['message'] = temp['message'].apply(remove_stop_words)
-    df_wc = wc.generate(temp['message'].str.cat(sep=" "))
-    return df_wc
+    return wc.generate(text).to_array()
 
-def most_common_words(selected_user,df):
+def create_wordcloud(df):
+    return _render_wc(_wc_tokens(df))
 
-    f = open('stop_hinglish.txt','r')
-    stop_words = f.read()
+@st.cache_data
+def most_common_words(df):
 
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
+    stop_words = _stopwords()
 
     temp = df[df['user'] != 'group_notification']
     temp = temp[temp['message'] != '<Media omitted>\n']
@@ -80,13 +85,11 @@ def most_common_words(selected_user,df):
     most_common_df = pd.DataFrame(Counter(words).most_common(20))
     return most_common_df
 
-def emoji_helper(selected_user,df):
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
-
+@st.cache_data(show_spinner=False)
+def emoji_helper(df):
     emojis = []
     for message in df['message']:
-        emojis.extend([c for c in message if emoji.emoji_count(c) > 0])
+        emojis.extend([c for c in message if c in emoji.EMOJI_DATA])
 
 
 
@@ -96,62 +99,56 @@ def emoji_helper(selected_user,df):
 
     return emoji_df
 
-def monthly_timeline(selected_user,df):
+@st.cache_data(show_spinner=False)
+def monthly_timeline(df):
 
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
+    timeline = df.groupby(['year', 'month_num', 'month'], observed=True)['message'].count().reset_index()
+    timeline['message'] = pd.to_numeric(timeline['message'], downcast='unsigned')
 
-    timeline = df.groupby(['year', 'month_num', 'month']).count()['message'].reset_index()
-
-    time = []
-    for i in range(timeline.shape[0]):
-        time.append(timeline['month'][i] + "-" + str(timeline['year'][i]))
-
-    timeline['time'] = time
+    # first day of each month, so charts plot the months in calendar order
+    timeline['time'] = pd.to_datetime(pd.DataFrame({'year': timeline['year'], 'month': timeline['month_num'], 'day': 1}))
 
     return timeline
 
-def daily_timeline(selected_user,df):
+@st.cache_data(show_spinner=False)
+def daily_timeline(df):
 
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
-
-    daily_timeline = df.groupby('only_date').count()['message'].reset_index()
+    daily_timeline = df.groupby('only_date')['message'].count().reset_index()
+    daily_timeline['message'] = pd.to_numeric(daily_timeline['message'], downcast='unsigned')
 
     return daily_timeline
 
-def week_activity_map(selected_user,df):
-
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
+@st.cache_data(show_spinner=False)
+def week_activity_map(df):
 
-    return df['day_name'].value_counts()
+    # day_name is categorical over all seven days; keep only the ones with messages
+    return pd.to_numeric(df['day_name'].value_counts().loc[lambda counts: counts > 0], downcast='unsigned')
 
-def month_activity_map(selected_user,df):
+@st.cache_data(show_spinner=False)
+def month_activity_map(df):
 
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
+    # month is categorical over all twelve months; keep only the ones with messages
+    return pd.to_numeric(df['month'].value_counts().loc[lambda counts: counts > 0], downcast='unsigned')
 
-    return df['month'].value_counts()
+@st.cache_data(show_spinner=False)
+def activity_heatmap(df):
 
-def activity_heatmap(selected_user,df):
-
-    if selected_user != 'Overall':
-        df = df[df['user'] == selected_user]
-
-    user_heatmap = df.pivot_table(index='day_name', columns='period', values='message', aggfunc='count').fillna(0)
+    user_heatmap = pd.crosstab(df['day_name'], df['period']).apply(pd.to_numeric, downcast='unsigned')
 
     return user_heatmap
 
-def analyze_sentiment_wrapper(message):
-    analysis = TextBlob(message)
-    if analysis.sentiment.polarity > 0:
+def sentiment_label(polarity):
+    if polarity > 0:
         return "Positive"
-    elif analysis.sentiment.polarity < 0:
+    elif polarity < 0:
         return "Negative"
     else:
         return "Neutral"
 
+def analyze_sentiments_batch(messages):
+    # one shared analyzer for the whole batch instead of a TextBlob per message
+    return np.array([sentiment_label(analyzer.analyze(message).polarity) for message in messages])
+
 
 
 
@@ -1,55 +1,57 @@
 import pandas as pd
 import re
 
-def preprocess(data):
-    pattern = '\d{1,2}/\d{1,2}/\d{2,4},\s\d{1,2}:\d{2}\s-\s'
-
-    messages = re.split(pattern, data)[1:]
-    dates = re.findall(pattern, data)
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PERIODS = ['00-1'] + [str(hour) + "-" + str(hour + 1) for hour in range(1, 23)] + ['23-00']
+
+# anchored to line starts: the engine gives up on every other position at once, and a
+# stamp quoted inside a message no longer splits it
+DATE_PATTERN = re.compile(r'^(\d{1,2}/\d{1,2}/\d{2}(?:\d{2})?,\s\d{1,2}:\d{2}\s-\s)', re.MULTILINE)
+# keyed by the number of digits in the stamp's year
+DATE_FORMATS = {2: '%d/%m/%y, %H:%M -', 4: '%d/%m/%Y, %H:%M -'}
+USER_PATTERN = re.compile(r'^([\w\W]+?):\s([\w\W]*)')
 
-    df = pd.DataFrame({'user_message': messages, 'message_date': dates})
-
-    df['message_date'] = pd.to_datetime(df['message_date'].str.strip(), format='%d/%m/%y, %H:%M -')
+def preprocess(data):
+    # a leading byte-order mark would keep the first stamp from matching at the start of a line
+    data = data.removeprefix('\ufeff')
 
-    df.rename(columns={'message_date': 'date'}, inplace=True)
+    # an export starts with a dated line, so an unsupported file is rejected without scanning all of it
+    probe = DATE_PATTERN.search(data, 0, 4096)
+    if probe is None:
+        raise ValueError("Unrecognised chat format: expected WhatsApp export lines like '31/12/23, 21:05 - Name: message'")
+    date_format = DATE_FORMATS[len(probe.group(1).split(',')[0].split('/')[2])]
 
-    users = []
-    messages = []
+    # the pattern captures the stamp, so one split yields [preamble, date, message, date, message, ...]
+    parts = DATE_PATTERN.split(data)
+    dates = pd.Series(parts[1::2])
+    messages = pd.Series(parts[2::2])
 
-    for message in df['user_message']:
-        entry = re.split('([\w\W]+?):\s', message)
-        if entry[1:]:  # user name
-            users.append(entry[1])
-            messages.append(" ".join(entry[2:]))
-        else:
-            users.append('group_notification')
-            messages.append(entry[0])
+    # lines without a "user: " prefix are group notifications and keep their whole text
+    entry = messages.str.extract(USER_PATTERN)
 
-    df['user'] = users
-    df['message'] = messages
-    df.drop(columns=['user_message'], inplace=True)
+    df = pd.DataFrame({
+        'date': pd.to_datetime(dates.str.strip(), format=date_format),
+        'user': pd.Categorical(entry[0].fillna('group_notification')),
+        'message': entry[1].fillna(messages),
+    })
 
   
 
-    df['only_date'] = df['date'].dt.date
-    df['year'] = df['date'].dt.year
-    df['month_num'] = df['date'].dt.month
-    df['month'] = df['date'].dt.month_name()
-    df['day'] = df['date'].dt.day
-    df['day_name'] = df['date'].dt.day_name()
-    df['hour'] = df['date'].dt.hour
-    df['minute'] = df['date'].dt.minute
-
-    period = []
-    for hour in df[['day_name', 'hour']]['hour']:
-        if hour == 23:
-            period.append(str(hour) + "-" + str('00'))
-        elif hour == 0:
-            period.append(str('00') + "-" + str(hour + 1))
-        else:
-            period.append(str(hour) + "-" + str(hour + 1))
-
-    df['period'] = period
+    # month and day names come from the numeric codes instead of formatting a string per row
+    dt = df['date'].dt
+    df['only_date'] = dt.date
+    df['year'] = dt.year.astype('uint16')
+    df['month_num'] = dt.month.astype('uint8')
+    df['month'] = pd.Categorical.from_codes(df['month_num'] - 1, categories=MONTHS, ordered=True)
+    df['day'] = dt.day.astype('uint8')
+    df['day_name'] = pd.Categorical.from_codes(dt.dayofweek, categories=DAYS, ordered=True)
+    df['hour'] = dt.hour.astype('uint8')
+    df['minute'] = dt.minute.astype('uint8')
+
+    # PERIODS[h] is the label for hour h, so the hours are already the category codes
+    df['period'] = pd.Categorical.from_codes(df['hour'], categories=PERIODS, ordered=True)
 
 
 